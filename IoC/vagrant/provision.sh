@@ -106,6 +106,8 @@ echo "  → Installing Python dependencies from requirements.txt"
 pip install -r requirements.txt
 echo "  → Installing Gunicorn (production WSGI server)"
 pip install gunicorn
+echo "  → Pre-compressing static assets (gzip + brotli)"
+python3 compress_static.py
 echo "  → Deactivating virtual environment"
 deactivate
 
@@ -159,7 +161,7 @@ After=network.target mysql.service redis-server.service
 User=root
 WorkingDirectory=/opt/joke-app
 Environment="PATH=/opt/joke-app/venv/bin"
-ExecStart=/opt/joke-app/venv/bin/gunicorn --bind 0.0.0.0:5000 --workers 2 app:app
+ExecStart=/opt/joke-app/venv/bin/gunicorn --config gunicorn.conf.py app:app
 Restart=always
 RestartSec=5
 
@@ -200,6 +202,10 @@ server {
     listen 80;
     server_name _;
 
+    # Compress proxied HTML/JSON responses too
+    gzip_proxied any;
+    gzip_types text/css application/javascript application/json application/x-ndjson text/csv;
+
     location / {
         proxy_pass http://127.0.0.1:5000;
         proxy_http_version 1.1;
@@ -208,9 +214,22 @@ server {
         proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
         proxy_set_header X-Forwarded-Proto $scheme;
     }
+
+    # Fingerprinted assets straight from disk, pre-compressed (.gz/.br)
+    location /static/ {
+        alias /opt/joke-app/static/;
+        gzip_static on;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+        access_log off;
+    }
 }
 NGINX_CONFIG
 
+echo "  → Enabling brotli_static if a brotli module is available"
+if apt-get install -y libnginx-mod-http-brotli-static; then
+    echo "brotli_static on;" > /etc/nginx/conf.d/brotli-static.conf
+fi
+
 echo "  → Enabling site (creating symlink)"
 ln -sf /etc/nginx/sites-available/joke-app /etc/nginx/sites-enabled/
 echo "  → Removing default nginx site"
@@ -1,9 +1,13 @@
-from flask import Flask, jsonify, render_template_string, request, redirect, url_for
-import mysql.connector
-import redis
+from flask import Blueprint, Flask, jsonify, render_template, request, redirect, url_for, make_response, Response, stream_with_context, current_app
+from backends import Backends
+from categories import tag_joke, untag_joke, pick_in_category
+from export import EXPORT_FORMATS, iter_jokes, iter_export, gzip_chunks
+import hashlib
+import os
+import re
 import time
 
-app = Flask(__name__)
+bp = Blueprint('jokes', __name__)
 
 # Database configuration
 db_config = {
@@ -13,718 +17,395 @@ db_config = {
     'database': 'jokes_db'
 }
 
-# Redis configuration
-redis_client = redis.Redis(host='localhost', port=6379, decode_responses=True)
-
-# Main page HTML template
-HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Joke-a-Minute 😂</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-
-        .nav {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-
-        .nav a {
-            display: inline-block;
-            padding: 12px 30px;
-            background: rgba(255, 255, 255, 0.95);
-            color: #667eea;
-            text-decoration: none;
-            border-radius: 15px;
-            margin: 0 10px;
-            font-weight: bold;
-            transition: all 0.3s ease;
-            box-shadow: 0 5px 15px rgba(0, 0, 0, 0.2);
-        }
-
-        .nav a:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 20px rgba(0, 0, 0, 0.3);
-        }
-
-        .container {
-            background: rgba(255, 255, 255, 0.95);
-            border-radius: 30px;
-            padding: 50px 40px;
-            max-width: 600px;
-            margin: 0 auto;
-            box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-            backdrop-filter: blur(10px);
-        }
-
-        h1 {
-            color: #667eea;
-            font-size: 3em;
-            text-align: center;
-            margin-bottom: 10px;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.1);
-        }
-
-        .subtitle {
-            text-align: center;
-            color: #666;
-            margin-bottom: 40px;
-            font-size: 1.1em;
-        }
-
-        .joke-container {
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-            border-radius: 20px;
-            padding: 40px;
-            margin-bottom: 30px;
-            min-height: 150px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            position: relative;
-            overflow: hidden;
-        }
-
-        .joke-container::before {
-            content: '"';
-            position: absolute;
-            top: -20px;
-            left: 20px;
-            font-size: 120px;
-            color: rgba(102, 126, 234, 0.1);
-            font-family: Georgia, serif;
-        }
-
-        .joke-text {
-            font-size: 1.4em;
-            color: #333;
-            text-align: center;
-            line-height: 1.6;
-            position: relative;
-            z-index: 1;
-        }
-
-        .loading {
-            color: #999;
-            font-style: italic;
-        }
-
-        .btn {
-            width: 100%;
-            padding: 18px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            border-radius: 15px;
-            font-size: 1.2em;
-            font-weight: bold;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            box-shadow: 0 5px 15px rgba(102, 126, 234, 0.4);
-        }
-
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 20px rgba(102, 126, 234, 0.6);
-        }
-
-        .btn:active {
-            transform: translateY(0);
-        }
-
-        .stats {
-            display: flex;
-            justify-content: space-around;
-            margin-top: 30px;
-            padding-top: 30px;
-            border-top: 2px solid #e0e0e0;
-        }
-
-        .stat {
-            text-align: center;
-        }
-
-        .stat-value {
-            font-size: 2em;
-            font-weight: bold;
-            color: #667eea;
-            display: block;
-        }
-
-        .stat-label {
-            color: #999;
-            font-size: 0.9em;
-            margin-top: 5px;
-        }
-
-        .cache-indicator {
-            display: inline-block;
-            width: 10px;
-            height: 10px;
-            border-radius: 50%;
-            margin-left: 10px;
-        }
-
-        .cached {
-            background: #4caf50;
-            box-shadow: 0 0 10px #4caf50;
-        }
-
-        .fresh {
-            background: #ff9800;
-            box-shadow: 0 0 10px #ff9800;
-        }
-
-        @keyframes fadeIn {
-            from {
-                opacity: 0;
-                transform: translateY(20px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-
-        .fade-in {
-            animation: fadeIn 0.5s ease;
-        }
-    </style>
-</head>
-<body>
-    <div class="nav">
-        <a href="/">🎲 Random Joke</a>
-        <a href="/add">➕ Add Joke</a>
-        <a href="/manage">📋 Manage Jokes</a>
-    </div>
-
-    <div class="container">
-        <h1>😂 Joke-a-Minute</h1>
-        <p class="subtitle">Your daily dose of dad jokes, cached fresh!</p>
-
-        <div class="joke-container">
-            <div id="joke" class="joke-text loading">Click the button to get a joke!</div>
-        </div>
-
-        <button class="btn" onclick="getJoke()">Get New Joke 🎲</button>
-
-        <div class="stats">
-            <div class="stat">
-                <span id="source" class="stat-value">-</span>
-                <span class="stat-label">Source</span>
-            </div>
-            <div class="stat">
-                <span id="responseTime" class="stat-value">-</span>
-                <span class="stat-label">Response Time</span>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        async function getJoke() {
-            const jokeEl = document.getElementById('joke');
-            const sourceEl = document.getElementById('source');
-            const timeEl = document.getElementById('responseTime');
-
-            jokeEl.className = 'joke-text loading';
-            jokeEl.textContent = 'Loading joke...';
-
-            const startTime = performance.now();
-
-            try {
-                const response = await fetch('/joke');
-                const data = await response.json();
-                const endTime = performance.now();
-                const responseTime = Math.round(endTime - startTime);
-
-                jokeEl.className = 'joke-text fade-in';
-                jokeEl.textContent = data.joke;
-
-                sourceEl.innerHTML = data.source === 'cache' 
-                    ? 'Redis <span class="cache-indicator cached"></span>' 
-                    : 'MySQL <span class="cache-indicator fresh"></span>';
-                timeEl.textContent = responseTime + 'ms';
-            } catch (error) {
-                jokeEl.className = 'joke-text';
-                jokeEl.textContent = 'Oops! Failed to fetch a joke. Try again!';
-            }
-        }
-
-        // Load a joke on page load
-        window.onload = getJoke;
-    </script>
-</body>
-</html>
-'''
-
-# Add joke page HTML template
-ADD_JOKE_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Add Joke 😂</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-
-        .nav {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-
-        .nav a {
-            display: inline-block;
-            padding: 12px 30px;
-            background: rgba(255, 255, 255, 0.95);
-            color: #667eea;
-            text-decoration: none;
-            border-radius: 15px;
-            margin: 0 10px;
-            font-weight: bold;
-            transition: all 0.3s ease;
-            box-shadow: 0 5px 15px rgba(0, 0, 0, 0.2);
-        }
-
-        .nav a:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 20px rgba(0, 0, 0, 0.3);
-        }
-
-        .container {
-            background: rgba(255, 255, 255, 0.95);
-            border-radius: 30px;
-            padding: 50px 40px;
-            max-width: 600px;
-            margin: 0 auto;
-            box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-        }
-
-        h1 {
-            color: #667eea;
-            font-size: 2.5em;
-            text-align: center;
-            margin-bottom: 10px;
-        }
-
-        .subtitle {
-            text-align: center;
-            color: #666;
-            margin-bottom: 40px;
-            font-size: 1.1em;
-        }
-
-        .form-group {
-            margin-bottom: 25px;
-        }
-
-        label {
-            display: block;
-            color: #333;
-            font-weight: bold;
-            margin-bottom: 10px;
-            font-size: 1.1em;
-        }
-
-        textarea {
-            width: 100%;
-            padding: 15px;
-            border: 2px solid #e0e0e0;
-            border-radius: 15px;
-            font-size: 1.1em;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            resize: vertical;
-            min-height: 120px;
-            transition: border-color 0.3s ease;
-        }
-
-        textarea:focus {
-            outline: none;
-            border-color: #667eea;
-        }
-
-        .btn {
-            width: 100%;
-            padding: 18px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            border-radius: 15px;
-            font-size: 1.2em;
-            font-weight: bold;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            box-shadow: 0 5px 15px rgba(102, 126, 234, 0.4);
-        }
-
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 20px rgba(102, 126, 234, 0.6);
-        }
-
-        .btn:active {
-            transform: translateY(0);
-        }
-
-        .success-message {
-            background: #4caf50;
-            color: white;
-            padding: 15px;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 20px;
-            font-weight: bold;
-        }
-    </style>
-</head>
-<body>
-    <div class="nav">
-        <a href="/">🎲 Random Joke</a>
-        <a href="/add">➕ Add Joke</a>
-        <a href="/manage">📋 Manage Jokes</a>
-    </div>
-
-    <div class="container">
-        <h1>➕ Add New Joke</h1>
-        <p class="subtitle">Share your best dad joke!</p>
-
-        {% if success %}
-        <div class="success-message">
-            ✅ Joke added successfully!
-        </div>
-        {% endif %}
-
-        <form method="POST" action="/add">
-            <div class="form-group">
-                <label for="joke">Your Joke:</label>
-                <textarea id="joke" name="joke" placeholder="Why did the chicken cross the road? ..." required></textarea>
-            </div>
-
-            <button type="submit" class="btn">Add Joke 🎉</button>
-        </form>
-    </div>
-</body>
-</html>
-'''
-
-# Manage jokes page HTML template
-MANAGE_JOKES_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Manage Jokes 😂</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-
-        .nav {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-
-        .nav a {
-            display: inline-block;
-            padding: 12px 30px;
-            background: rgba(255, 255, 255, 0.95);
-            color: #667eea;
-            text-decoration: none;
-            border-radius: 15px;
-            margin: 0 10px;
-            font-weight: bold;
-            transition: all 0.3s ease;
-            box-shadow: 0 5px 15px rgba(0, 0, 0, 0.2);
-        }
-
-        .nav a:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 20px rgba(0, 0, 0, 0.3);
-        }
-
-        .container {
-            background: rgba(255, 255, 255, 0.95);
-            border-radius: 30px;
-            padding: 50px 40px;
-            max-width: 900px;
-            margin: 0 auto;
-            box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-        }
-
-        h1 {
-            color: #667eea;
-            font-size: 2.5em;
-            text-align: center;
-            margin-bottom: 10px;
-        }
-
-        .subtitle {
-            text-align: center;
-            color: #666;
-            margin-bottom: 40px;
-            font-size: 1.1em;
-        }
-
-        .joke-count {
-            text-align: center;
-            color: #667eea;
-            font-size: 1.3em;
-            font-weight: bold;
-            margin-bottom: 30px;
-        }
-
-        .jokes-table {
-            width: 100%;
-            border-collapse: separate;
-            border-spacing: 0 15px;
-        }
-
-        .jokes-table tr {
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-            border-radius: 15px;
-        }
-
-        .jokes-table td {
-            padding: 20px;
-            vertical-align: middle;
-        }
-
-        .jokes-table td:first-child {
-            border-radius: 15px 0 0 15px;
-            width: 60px;
-            text-align: center;
-            font-weight: bold;
-            color: #667eea;
-            font-size: 1.2em;
-        }
-
-        .jokes-table td:nth-child(2) {
-            font-size: 1.1em;
-            color: #333;
-            line-height: 1.6;
-        }
-
-        .jokes-table td:last-child {
-            border-radius: 0 15px 15px 0;
-            text-align: right;
-            width: 100px;
-        }
-
-        .delete-btn {
-            padding: 10px 20px;
-            background: linear-gradient(135deg, #ff6b6b 0%, #ee5a6f 100%);
-            color: white;
-            border: none;
-            border-radius: 10px;
-            font-weight: bold;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            box-shadow: 0 3px 10px rgba(255, 107, 107, 0.4);
-        }
-
-        .delete-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(255, 107, 107, 0.6);
-        }
-
-        .delete-btn:active {
-            transform: translateY(0);
-        }
-
-        .no-jokes {
-            text-align: center;
-            color: #999;
-            font-size: 1.2em;
-            padding: 40px;
-        }
-    </style>
-</head>
-<body>
-    <div class="nav">
-        <a href="/">🎲 Random Joke</a>
-        <a href="/add">➕ Add Joke</a>
-        <a href="/manage">📋 Manage Jokes</a>
-    </div>
-
-    <div class="container">
-        <h1>📋 Manage Jokes</h1>
-        <p class="subtitle">View and delete jokes from the database</p>
-
-        <div class="joke-count">
-            Total Jokes: {{ jokes|length }}
-        </div>
-
-        {% if jokes %}
-        <table class="jokes-table">
-            {% for joke in jokes %}
-            <tr>
-                <td>#{{ joke.id }}</td>
-                <td>{{ joke.text }}</td>
-                <td>
-                    <form method="POST" action="/delete/{{ joke.id }}" style="display: inline;" onsubmit="return confirm('Are you sure you want to delete this joke?');">
-                        <button type="submit" class="delete-btn">🗑️ Delete</button>
-                    </form>
-                </td>
-            </tr>
-            {% endfor %}
-        </table>
-        {% else %}
-        <div class="no-jokes">
-            No jokes found. Add some jokes to get started! 🎭
-        </div>
-        {% endif %}
-    </div>
-</body>
-</html>
-'''
+# MySQL router, cache, counters and weighted selector, built lazily in each
+# worker process (see backends.py for the environment settings they read)
+backends = Backends(db_config)
+
+# After a write, the same client reads from the primary for this many seconds
+# so it sees its own changes even if the replicas lag behind.
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('DB_READ_YOUR_WRITES_SECONDS', '5'))
+LAST_WRITE_COOKIE = 'last_write'
+
+CATEGORY_PATTERN = re.compile(r'^[a-z0-9-]{1,50}$')
+
+# Static assets are referenced as /static/<file>?v=<content hash>, so they can
+# be cached forever and a changed file gets a new URL
+STATIC_MAX_AGE = 31536000
+static_fingerprints = {}
+
+
+def fingerprint(static_folder, filename):
+    if filename not in static_fingerprints:
+        with open(os.path.join(static_folder, filename), 'rb') as f:
+            static_fingerprints[filename] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return static_fingerprints[filename]
+
+
+@bp.app_template_global()
+def asset_url(filename):
+    return url_for('static', filename=filename, v=fingerprint(current_app.static_folder, filename))
+
+
+@bp.after_app_request
+def cache_static_assets(response):
+    if request.endpoint == 'static' and request.args.get('v'):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+def preload_templates(app):
+    # Compile every template and fingerprint every asset once per worker
+    # instead of on the first request that needs them
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    for root, _, files in os.walk(app.static_folder):
+        for name in files:
+            if not name.endswith(('.gz', '.br')):
+                fingerprint(app.static_folder, os.path.relpath(os.path.join(root, name), app.static_folder))
+
+
+def create_app():
+    # No backend connections here - they are made per worker on first use
+    # or by warm_up(), so the app can be created before gunicorn forks
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    preload_templates(app)
+    return app
+
+
+def warm_up():
+    start = time.perf_counter()
+    try:
+        backends.warm_up()
+    except Exception as e:
+        print(f"⚠️  Warm-up incomplete, connecting on first request instead: {e}")
+        return
+    print(f"🔥 Worker {os.getpid()} warmed up in {(time.perf_counter() - start) * 1000:.0f}ms")
 
 
 def get_db_connection():
-    return mysql.connector.connect(**db_config)
+    return backends.db_router.connect_primary()
 
 
-@app.route('/')
+def get_read_connection():
+    return backends.db_router.connect_read(use_primary=recently_wrote())
+
+
+def get_export_connection():
+    # An export holds its connection for the whole download and may leave a
+    # half-read result behind, so it gets one of its own instead of a pooled one
+    return backends.db_router.connect_read(use_primary=recently_wrote(), pooled=False)
+
+
+def recently_wrote():
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, 0))
+    except ValueError:
+        return False
+    return time.time() - last_write < READ_YOUR_WRITES_SECONDS
+
+
+def cache_key(category=None):
+    return f'joke:current:{category}' if category else 'joke:current'
+
+
+def parse_categories(value):
+    categories = {c.strip().lower() for c in value.split(',')}
+    return sorted(c for c in categories if CATEGORY_PATTERN.match(c))
+
+
+def select_random_joke(cursor, category=None):
+    if category is None and backends.weighted_selector:
+        joke_id = backends.weighted_selector.pick()
+        if joke_id is not None:
+            cursor.execute("SELECT id, text FROM jokes WHERE id = %s", (joke_id,))
+            result = cursor.fetchone()
+            if result:
+                return result
+        # No weights yet, or the joke was deleted by another worker - pick uniformly
+
+    if category is None:
+        cursor.execute("SELECT id, text FROM jokes ORDER BY RAND() LIMIT 1")
+        return cursor.fetchone()
+
+    return pick_in_category(cursor, category)
+
+
+def invalidate_jokes(categories=(), deleted_id=None):
+    # Also bumps the cache version, so a request that read a joke from MySQL
+    # before this write can no longer cache it, and tombstones a deleted joke
+    # so a lagging replica cannot hand it back to the cache afterwards
+    backends.cache.invalidate([cache_key()] + [cache_key(category) for category in categories],
+                              [deleted_id] if deleted_id is not None else ())
+
+
+def views_key():
+    # Counting views rides along with the cache scripts instead of costing
+    # its own Redis round trip
+    return backends.stats.key if backends.stats else None
+
+
+def mark_write(response):
+    response = make_response(response)
+    response.set_cookie(LAST_WRITE_COOKIE, str(time.time()),
+                        max_age=READ_YOUR_WRITES_SECONDS, httponly=True)
+    return response
+
+
+@bp.route('/')
 def home():
-    return render_template_string(HTML_TEMPLATE)
+    return render_template('index.html')
 
 
-@app.route('/joke')
+@bp.route('/joke')
 def get_joke():
-    # Check Redis cache first
-    cached_joke = redis_client.get('joke:current')
+    category = request.args.get('category', '').strip().lower() or None
+    if category and not CATEGORY_PATTERN.match(category):
+        return jsonify({'error': 'Invalid category'}), 400
+
+    # Check cache first; the version guards the store on a miss
+    joke, version = backends.cache.fetch_joke(cache_key(category), views_key())
 
-    if cached_joke:
+    if joke:
         return jsonify({
-            'joke': cached_joke,
+            'id': joke['id'],
+            'joke': joke['text'],
             'source': 'cache',
+            'category': category,
+            'votable': backends.stats is not None,
             'timestamp': time.time()
         })
 
     # Cache miss - fetch from database
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
 
     # Get a random joke
-    cursor.execute("SELECT text FROM jokes ORDER BY RAND() LIMIT 1")
-    result = cursor.fetchone()
+    result = select_random_joke(cursor, category)
 
     cursor.close()
     conn.close()
 
     if result:
-        joke_text = result[0]
-        # Cache the joke for 60 seconds
-        redis_client.setex('joke:current', 10, joke_text)
+        joke_id, joke_text = result
+        # Cache the joke for 10 seconds, unless a write invalidated the cache
+        # while we were reading
+        backends.cache.store_joke(cache_key(category), 10, joke_id, joke_text, version, views_key())
 
         return jsonify({
+            'id': joke_id,
             'joke': joke_text,
             'source': 'database',
+            'category': category,
+            'votable': backends.stats is not None,
             'timestamp': time.time()
         })
 
     return jsonify({
         'joke': 'No jokes available!',
         'source': 'error',
+        'category': category,
         'timestamp': time.time()
     }), 404
 
 
-@app.route('/add', methods=['GET', 'POST'])
+@bp.route('/vote/<int:joke_id>', methods=['POST'])
+def vote_joke(joke_id):
+    vote = request.form.get('vote') or (request.get_json(silent=True) or {}).get('vote')
+    if vote not in ('up', 'down'):
+        return jsonify({'error': "vote must be 'up' or 'down'"}), 400
+    if not backends.stats:
+        return jsonify({'error': 'Voting needs the Redis cache backend'}), 503
+
+    # Unknown ids would pile up as fields of joke:stats until the next flush
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM jokes WHERE id = %s", (joke_id,))
+    found = cursor.fetchone() is not None
+    cursor.close()
+    conn.close()
+    if not found:
+        return jsonify({'error': 'Joke not found'}), 404
+
+    backends.stats.record_vote(joke_id, vote == 'up')
+
+    return jsonify({'id': joke_id, 'vote': vote})
+
+
+@bp.route('/add', methods=['GET', 'POST'])
 def add_joke():
     success = False
 
     if request.method == 'POST':
         joke_text = request.form.get('joke', '').strip()
+        categories = parse_categories(request.form.get('categories', ''))
 
         if joke_text:
             conn = get_db_connection()
             cursor = conn.cursor()
 
             cursor.execute("INSERT INTO jokes (text) VALUES (%s)", (joke_text,))
+            joke_id = cursor.lastrowid
+            tag_joke(cursor, joke_id, categories)
             conn.commit()
 
             cursor.close()
             conn.close()
 
             # Clear cache so new joke can be selected
-            redis_client.delete('joke:current')
+            invalidate_jokes(categories)
+            if backends.weighted_selector:
+                # New jokes have no votes yet, which derives to weight 1
+                backends.weighted_selector.set_weight(joke_id, 1.0)
 
             success = True
 
-    return render_template_string(ADD_JOKE_TEMPLATE, success=success)
+    response = render_template('add.html', success=success)
+    return mark_write(response) if success else response
 
 
-@app.route('/manage')
+@bp.route('/manage')
 def manage_jokes():
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
 
-    cursor.execute("SELECT id, text FROM jokes ORDER BY id")
+    cursor.execute('''
+        SELECT j.id, j.text, j.weight, GROUP_CONCAT(c.name ORDER BY c.name SEPARATOR ', ') AS categories,
+               COALESCE(s.views, 0) AS views, COALESCE(s.upvotes, 0) AS upvotes,
+               COALESCE(s.downvotes, 0) AS downvotes
+        FROM jokes j
+        LEFT JOIN joke_categories jc ON jc.joke_id = j.id
+        LEFT JOIN categories c ON c.id = jc.category_id
+        LEFT JOIN joke_stats s ON s.joke_id = j.id
+        GROUP BY j.id, j.text, j.weight, s.views, s.upvotes, s.downvotes
+        ORDER BY j.id
+    ''')
     jokes = cursor.fetchall()
 
     cursor.close()
     conn.close()
 
-    return render_template_string(MANAGE_JOKES_TEMPLATE, jokes=jokes)
+    return render_template('manage.html', jokes=jokes)
+
+
+@bp.route('/weight/<int:joke_id>', methods=['POST'])
+def set_joke_weight(joke_id):
+    value = request.form.get('weight', '').strip()
+    weight = None
+    if value:
+        try:
+            weight = float(value)
+        except ValueError:
+            weight = float('nan')
+        if not 0 <= weight < float('inf'):
+            return jsonify({'error': 'weight must be a non-negative number, or empty to derive it from votes'}), 400
 
+    conn = get_db_connection()
+    cursor = conn.cursor()
 
-@app.route('/delete/<int:joke_id>', methods=['POST'])
+    cursor.execute("SELECT id FROM jokes WHERE id = %s FOR UPDATE", (joke_id,))
+    found = cursor.fetchone() is not None
+    if found:
+        cursor.execute("UPDATE jokes SET weight = %s WHERE id = %s", (weight, joke_id))
+    conn.commit()
+
+    cursor.close()
+    conn.close()
+
+    if not found:
+        return jsonify({'error': 'Joke not found'}), 404
+
+    if backends.weighted_selector:
+        if weight is None:
+            # The vote-derived weight lives in MySQL
+            backends.weighted_selector.refresh_weight(joke_id)
+        else:
+            backends.weighted_selector.set_weight(joke_id, weight)
+
+    return mark_write(redirect(url_for('.manage_jokes')))
+
+
+@bp.route('/delete/<int:joke_id>', methods=['POST'])
 def delete_joke(joke_id):
     conn = get_db_connection()
     cursor = conn.cursor()
 
+    # Renumbers the categories first; the cascade alone would leave holes
+    categories = untag_joke(cursor, joke_id)
     cursor.execute("DELETE FROM jokes WHERE id = %s", (joke_id,))
+    cursor.execute("DELETE FROM joke_stats WHERE joke_id = %s", (joke_id,))
     conn.commit()
 
     cursor.close()
     conn.close()
 
     # Clear cache after deletion
-    redis_client.delete('joke:current')
+    invalidate_jokes(categories, deleted_id=joke_id)
+    if backends.weighted_selector:
+        backends.weighted_selector.set_weight(joke_id, None)
 
-    return redirect(url_for('manage_jokes'))
+    return mark_write(redirect(url_for('.manage_jokes')))
 
 
-@app.route('/health')
+@bp.route('/categories')
+def list_categories():
+    conn = get_read_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    cursor.execute('''
+        SELECT name, joke_count AS jokes FROM categories ORDER BY name
+    ''')
+    categories = cursor.fetchall()
+
+    cursor.close()
+    conn.close()
+
+    return jsonify({'categories': categories})
+
+
+@bp.route('/export')
+def export_jokes():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown format, use one of: {", ".join(EXPORT_FORMATS)}'}), 400
+
+    try:
+        after_id = int(request.args.get('after_id', 0))
+    except ValueError:
+        return jsonify({'error': 'after_id must be an integer'}), 400
+
+    chunks = iter_export(iter_jokes(get_export_connection, after_id), export_format)
+    headers = {
+        'Content-Disposition': f'attachment; filename=jokes.{export_format}',
+        # Let nginx pass chunks straight through instead of buffering the export
+        'X-Accel-Buffering': 'no'
+    }
+
+    if request.args.get('gzip') == '1' or 'gzip' in request.headers.get('Accept-Encoding', ''):
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+
+    return Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format], headers=headers)
+
+
+@bp.route('/health')
 def health():
     try:
-        # Check MySQL
-        conn = get_db_connection()
+        # Check the MySQL primary (writes) on its own, a healthy replica must not hide it
+        conn = backends.db_router.connect_primary()
+        conn.ping()
+        conn.close()
+        primary_status = 'ok'
+    except:
+        primary_status = 'error'
+
+    try:
+        # Check MySQL reads (a replica, or the primary as fallback)
+        conn = get_read_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM jokes")
         joke_count = cursor.fetchone()[0]
@@ -736,19 +417,26 @@ def health():
         joke_count = 0
 
     try:
-        # Check Redis
-        redis_client.ping()
-        redis_status = 'ok'
+        # Check cache
+        backends.cache.ping()
+        cache_status = 'ok'
     except:
-        redis_status = 'error'
+        cache_status = 'error'
 
     return jsonify({
-        'status': 'healthy' if mysql_status == 'ok' and redis_status == 'ok' else 'unhealthy',
+        'status': 'healthy' if primary_status == mysql_status == cache_status == 'ok' else 'unhealthy',
         'mysql': mysql_status,
-        'redis': redis_status,
+        'mysql_primary': primary_status,
+        backends.cache.name: cache_status,
+        'replicas': backends.db_router.replica_status(),
         'total_jokes': joke_count
     })
 
 
+app = create_app()
+
+
 if __name__ == '__main__':
+    if os.environ.get('WARM_UP', '1') == '1':
+        warm_up()
     app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
\ No newline at end of file
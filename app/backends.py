@@ -0,0 +1,93 @@
+import os
+import threading
+
+
+class Backends:
+    """Per-process MySQL and cache clients, created on first use.
+
+    Nothing connects (or even imports a driver) at import time, so a worker
+    starts fast and a gunicorn ``preload_app`` master holds no sockets, file
+    locks or threads. The clients remember which process built them; after a
+    fork the child builds its own instead of sharing the parent's.
+    """
+
+    def __init__(self, db_config):
+        self.db_config = dict(db_config)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def db_router(self):
+        self._ensure()
+        return self._db_router
+
+    @property
+    def cache(self):
+        self._ensure()
+        return self._cache
+
+    @property
+    def stats(self):
+        self._ensure()
+        return self._stats
+
+    @property
+    def weighted_selector(self):
+        self._ensure()
+        return self._weighted_selector
+
+    def warm_up(self):
+        """Open every connection and load per-worker state ahead of traffic."""
+        self._ensure()
+        self._cache.ping()
+        self._db_router.warm_up()
+        if self._weighted_selector:
+            self._weighted_selector.reload()
+
+    def _ensure(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._connect()
+                    self._pid = os.getpid()
+
+    def _connect(self):
+        from cache import make_cache
+        from db_router import DBRouter, parse_endpoints
+        from stats import JokeStats
+        from weighted import WeightedSelector
+
+        # Read/write splitting: writes always go to the primary (db_config, or
+        # DB_PRIMARY="host:port"), reads are spread over DB_REPLICAS="host:port,...".
+        db_config = dict(self.db_config)
+        if os.environ.get('DB_PRIMARY'):
+            db_config['host'], db_config['port'] = parse_endpoints(os.environ['DB_PRIMARY'])[0]
+
+        self._db_router = DBRouter(
+            db_config,
+            parse_endpoints(os.environ.get('DB_REPLICAS', '')),
+            eject_seconds=int(os.environ.get('DB_REPLICA_EJECT_SECONDS', '30')),
+            connect_timeout=int(os.environ.get('DB_CONNECT_TIMEOUT', '3')),
+            max_lag_seconds=int(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', '10')),
+            # Connections per endpoint in each worker's pool (0 disables pooling)
+            pool_size=int(os.environ.get('DB_POOL_SIZE', '5'))
+        )
+
+        # Cache configuration: CACHE_BACKEND=redis (default) or shm for single-node
+        # installs that share a memory-mapped cache between workers instead of Redis
+        self._cache = make_cache(os.environ.get('CACHE_BACKEND', 'redis'))
+
+        # View and vote counters are aggregated in Redis and flushed to MySQL in
+        # batches every STATS_FLUSH_SECONDS; they need the Redis cache backend
+        self._stats = None
+        if self._cache.name == 'redis':
+            self._stats = JokeStats(self._cache.client, self._db_router.connect_primary,
+                                    flush_seconds=int(os.environ.get('STATS_FLUSH_SECONDS', '10')))
+            self._stats.start()
+
+        # JOKE_SELECTION=weighted picks unfiltered jokes by weight (admin-set, or
+        # derived from votes) from a per-worker alias table instead of ORDER BY RAND()
+        self._weighted_selector = None
+        if os.environ.get('JOKE_SELECTION', 'uniform') == 'weighted':
+            self._weighted_selector = WeightedSelector(self._cache, self._db_router.connect_primary)
+            self._weighted_selector.start()
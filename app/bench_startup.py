@@ -0,0 +1,57 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs in a fresh interpreter so every sample pays the full cold-start cost
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+if sys.argv[2] == '1':
+    app.warm_up()
+warmed = time.perf_counter()
+response = app.app.test_client().get(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'warm_up': warmed - imported,
+    'first_response': done - warmed,
+    'total': done - start,
+    'status': response.status_code
+}))
+'''
+
+
+def run_once(path, warm_up):
+    env = dict(os.environ, WARM_UP='0')
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE, path, '1' if warm_up else '0'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure worker import-to-first-response time.')
+    parser.add_argument('--path', default='/', help='Request path for the first response (e.g. /joke)')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--warm-up', action='store_true', help='Run the warm-up phase before the first request')
+    args = parser.parse_args()
+
+    samples = [run_once(args.path, args.warm_up) for _ in range(args.runs)]
+
+    print(f"📊 {args.runs} cold starts, first request GET {args.path} "
+          f"(status {samples[-1]['status']}), warm-up {'on' if args.warm_up else 'off'}")
+    for phase in ('import', 'warm_up', 'first_response', 'total'):
+        values = [s[phase] * 1000 for s in samples]
+        print(f"  {phase:<15} median {statistics.median(values):8.1f}ms   "
+              f"min {min(values):8.1f}ms   max {max(values):8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+import contextlib
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+import redis
+
+# Bumped by every invalidation. A joke read from MySQL is only cached if the
+# version is still the one seen before the read, so a joke deleted meanwhile
+# can never be written back.
+VERSION_KEY = 'joke:cache:version'
+
+# Ids of recently deleted jokes. A lagging replica can still return a deleted
+# joke after the version was bumped, so such ids are never cached until the
+# replicas have caught up (kept at least as long as the replica lag we accept).
+TOMBSTONES_KEY = 'joke:deleted'
+
+# KEYS: cache key, version key[, views hash]  ARGV: -
+# Returns the cached joke and the current version; a hit also counts a view
+# (same '<id>:views' field format as stats.py). A value that is not a joke
+# written by store_joke, e.g. the plain text older releases cached under
+# joke:current, counts as a miss.
+FETCH_JOKE_SCRIPT = '''
+local value = redis.call('GET', KEYS[1])
+local version = redis.call('GET', KEYS[2]) or '0'
+if value then
+    local ok, joke = pcall(cjson.decode, value)
+    if not ok or type(joke) ~= 'table' or type(joke.id) ~= 'number' then
+        value = false
+    elseif KEYS[3] then
+        redis.call('HINCRBY', KEYS[3], joke.id .. ':views', 1)
+    end
+end
+return {value, version}
+'''
+
+# KEYS: cache key, version key, tombstones set[, views hash]
+# ARGV: value, ttl, version, joke id
+# Caches the joke only if nothing was invalidated since ARGV[3] was read and
+# the joke was not deleted recently
+STORE_JOKE_SCRIPT = '''
+if KEYS[4] then
+    redis.call('HINCRBY', KEYS[4], ARGV[4] .. ':views', 1)
+end
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[3] then
+    return 0
+end
+if redis.call('SISMEMBER', KEYS[3], ARGV[4]) == 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+'''
+
+
+def encode_joke(joke_id, text):
+    return json.dumps({'id': joke_id, 'text': text})
+
+
+def decode_joke(value):
+    """The joke dict stored by encode_joke, or None for anything else."""
+    try:
+        joke = json.loads(value) if value else None
+    except ValueError:
+        return None
+    return joke if isinstance(joke, dict) and 'id' in joke and 'text' in joke else None
+
+
+class RedisCache:
+    """Cache backend on a Redis server (the default)."""
+
+    name = 'redis'
+
+    def __init__(self, host='localhost', port=6379, tombstone_seconds=60):
+        self.client = redis.Redis(host=host, port=port, decode_responses=True)
+        self.tombstone_seconds = tombstone_seconds
+        self._fetch_joke = self.client.register_script(FETCH_JOKE_SCRIPT)
+        self._store_joke = self.client.register_script(STORE_JOKE_SCRIPT)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def setex(self, key, ttl, value):
+        self.client.setex(key, ttl, value)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def ping(self):
+        return self.client.ping()
+
+    def fetch_joke(self, key, views_key=None):
+        """Return (joke dict or None, version) in one round trip."""
+        keys = [key, VERSION_KEY] + ([views_key] if views_key else [])
+        value, version = self._fetch_joke(keys=keys)
+        return decode_joke(value), version
+
+    def store_joke(self, key, ttl, joke_id, text, version, views_key=None):
+        """Cache a joke unless invalidated since version was fetched or deleted; one round trip."""
+        keys = [key, VERSION_KEY, TOMBSTONES_KEY] + ([views_key] if views_key else [])
+        return bool(self._store_joke(keys=keys, args=[encode_joke(joke_id, text), ttl, version, joke_id]))
+
+    def invalidate(self, keys, deleted_ids=()):
+        """Bump the version, drop keys and record deleted ids atomically (one MULTI round trip)."""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(VERSION_KEY)
+        pipe.delete(*keys)
+        if deleted_ids:
+            # The whole set expires once deletes stop for tombstone_seconds
+            pipe.sadd(TOMBSTONES_KEY, *deleted_ids)
+            pipe.expire(TOMBSTONES_KEY, self.tombstone_seconds)
+        pipe.execute()
+
+
+class SharedMemoryCache:
+    """Cache backend in a memory-mapped file shared by all workers on a host.
+
+    The file is split into fixed-size slots, one key per slot (chosen by
+    hash; a colliding key simply evicts the old one, except for the cache
+    version and the deleted-joke tombstones, which have slots of their own).
+    Every slot is guarded by a sequence counter: a writer makes it odd,
+    rewrites the slot and makes it even again, so readers never take a lock -
+    they copy the slot and retry if the counter moved underneath them.
+    Writers serialize on ``flock`` between processes and on a thread lock
+    within one (``flock`` does not exclude threads sharing the descriptor).
+    Values that do not fit a slot are not cached.
+    """
+
+    name = 'shm'
+
+    # seq, expires_at, key length, value length
+    HEADER = struct.Struct('=Qdii')
+    MAX_KEY = 128
+    MAX_VALUE = 4096
+    # Slots are padded to whole cache lines, so every seq counter is 8-byte
+    # aligned and no two slots share a line
+    SLOT_SIZE = -(-(HEADER.size + MAX_KEY + MAX_VALUE) // 64) * 64
+
+    def __init__(self, path='/dev/shm/joke-app-cache', slots=64, tombstone_seconds=60):
+        self.path = path
+        self.slots = slots
+        self.tombstone_seconds = tombstone_seconds
+        size = self.SLOT_SIZE * slots
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, size)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._thread_lock = threading.Lock()
+
+    def get(self, key):
+        offset = self._offset(key)
+        key_bytes = key.encode()
+
+        for _ in range(100):
+            seq, expires_at, key_len, value_len = self.HEADER.unpack_from(self._map, offset)
+            if seq % 2:
+                continue
+            start = offset + self.HEADER.size
+            stored_key = self._map[start:start + key_len]
+            value = self._map[start + self.MAX_KEY:start + self.MAX_KEY + value_len]
+            if self.HEADER.unpack_from(self._map, offset)[0] != seq:
+                continue
+            if stored_key != key_bytes or expires_at < time.time():
+                return None
+            return value.decode()
+
+        # Constantly being rewritten - treat as a miss
+        return None
+
+    def setex(self, key, ttl, value):
+        return self._write(key, value.encode(), time.time() + ttl)
+
+    def delete(self, key):
+        self._write(key, b'', 0.0)
+
+    def ping(self):
+        return not self._map.closed
+
+    def fetch_joke(self, key, views_key=None):
+        # No view counters without Redis, views_key is ignored
+        return decode_joke(self.get(key)), self.get(VERSION_KEY) or '0'
+
+    def store_joke(self, key, ttl, joke_id, text, version, views_key=None):
+        with self._locked():
+            if (self.get(VERSION_KEY) or '0') != version:
+                return False
+            tombstones = self._tombstones()
+            if str(joke_id) in tombstones or '*' in tombstones:
+                return False
+            return self._write_locked(key, encode_joke(joke_id, text).encode(), time.time() + ttl)
+
+    def invalidate(self, keys, deleted_ids=()):
+        with self._locked():
+            version = int(self.get(VERSION_KEY) or '0') + 1
+            self._write_locked(VERSION_KEY, str(version).encode(), float('inf'))
+            for key in keys:
+                self._write_locked(key, b'', 0.0)
+
+            if deleted_ids:
+                until = time.time() + self.tombstone_seconds
+                tombstones = self._tombstones()
+                tombstones.update((str(joke_id), until) for joke_id in deleted_ids)
+                value = json.dumps(tombstones).encode()
+                if len(value) > self.MAX_VALUE:
+                    # Too many recent deletes to list - cache no joke at all for a while
+                    value = json.dumps({'*': until}).encode()
+                self._write_locked(TOMBSTONES_KEY, value, float('inf'))
+
+    def _tombstones(self):
+        # {joke id: expires_at}, '*' standing for every joke
+        value = self.get(TOMBSTONES_KEY)
+        now = time.time()
+        return {joke_id: until for joke_id, until in json.loads(value).items() if until > now} if value else {}
+
+    def _offset(self, key):
+        # Slots 0 and 1 are reserved for the version and the tombstones so no
+        # other key can ever evict them
+        if key == VERSION_KEY:
+            return 0
+        if key == TOMBSTONES_KEY:
+            return self.SLOT_SIZE
+        return (zlib.crc32(key.encode()) % (self.slots - 2) + 2) * self.SLOT_SIZE
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _write(self, key, value, expires_at):
+        with self._locked():
+            return self._write_locked(key, value, expires_at)
+
+    def _write_locked(self, key, value, expires_at):
+        """Write one slot; returns False (caching nothing) if it does not fit."""
+        key_bytes = key.encode()
+        if len(key_bytes) > self.MAX_KEY:
+            return False
+        if len(value) > self.MAX_VALUE:
+            # Too big to cache - still drop an older value cached under the key
+            self._write_locked(key, b'', 0.0)
+            return False
+
+        offset = self._offset(key)
+        start = offset + self.HEADER.size
+
+        # Force the parity instead of trusting it: a writer killed mid-write
+        # leaves the counter odd, and seq + 1 would then read as "stable"
+        seq = self.HEADER.unpack_from(self._map, offset)[0] | 1
+        struct.pack_into('=Q', self._map, offset, seq)
+        self._map[start:start + len(key_bytes)] = key_bytes
+        self._map[start + self.MAX_KEY:start + self.MAX_KEY + len(value)] = value
+        self.HEADER.pack_into(self._map, offset, seq, expires_at,
+                              len(key_bytes), len(value))
+        struct.pack_into('=Q', self._map, offset, seq + 1)
+        return True
+
+
+def make_cache(backend='redis'):
+    # Must exceed the replica lag the app tolerates before ejecting a replica
+    tombstone_seconds = int(os.environ.get('CACHE_TOMBSTONE_SECONDS', '60'))
+    if backend == 'shm':
+        return SharedMemoryCache(os.environ.get('CACHE_SHM_PATH', '/dev/shm/joke-app-cache'),
+                                 tombstone_seconds=tombstone_seconds)
+    if backend == 'redis':
+        return RedisCache(os.environ.get('REDIS_HOST', 'localhost'),
+                          int(os.environ.get('REDIS_PORT', '6379')),
+                          tombstone_seconds=tombstone_seconds)
+    raise ValueError(f'Unknown cache backend: {backend}')
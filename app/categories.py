@@ -0,0 +1,75 @@
+import random
+
+# Every category numbers its jokes 1..joke_count in joke_categories.ordinal
+# (unique per category), so a uniform random pick is a single lookup of a
+# random ordinal - no ORDER BY RAND(), no OFFSET scan, no bias from gaps in
+# the joke ids. Writers keep the numbering dense: a new joke gets the next
+# ordinal, and a removed joke's ordinal is taken over by the category's last
+# one. Category rows are locked in id order while doing so.
+
+
+def tag_joke(cursor, joke_id, names):
+    """Add joke_id to the named categories (created if missing)."""
+    if not names:
+        return
+
+    for name in names:
+        cursor.execute("INSERT IGNORE INTO categories (name) VALUES (%s)", (name,))
+
+    placeholders = ', '.join(['%s'] * len(names))
+    cursor.execute(f'''
+        SELECT id, joke_count FROM categories WHERE name IN ({placeholders})
+        ORDER BY id FOR UPDATE
+    ''', tuple(names))
+    for category_id, joke_count in cursor.fetchall():
+        cursor.execute('''
+            INSERT IGNORE INTO joke_categories (category_id, joke_id, ordinal)
+            VALUES (%s, %s, %s)
+        ''', (category_id, joke_id, joke_count + 1))
+        if cursor.rowcount:
+            cursor.execute("UPDATE categories SET joke_count = joke_count + 1 WHERE id = %s",
+                           (category_id,))
+
+
+def untag_joke(cursor, joke_id):
+    """Remove joke_id from all its categories and return their names.
+
+    Must run before the joke itself is deleted, since the cascading delete
+    would leave holes in the numbering.
+    """
+    cursor.execute('''
+        SELECT c.id, c.name, c.joke_count, jc.ordinal
+        FROM joke_categories jc JOIN categories c ON c.id = jc.category_id
+        WHERE jc.joke_id = %s ORDER BY c.id FOR UPDATE
+    ''', (joke_id,))
+    rows = cursor.fetchall()
+
+    for category_id, _, joke_count, ordinal in rows:
+        cursor.execute("DELETE FROM joke_categories WHERE category_id = %s AND joke_id = %s",
+                       (category_id, joke_id))
+        cursor.execute("UPDATE joke_categories SET ordinal = %s WHERE category_id = %s AND ordinal = %s",
+                       (ordinal, category_id, joke_count))
+        cursor.execute("UPDATE categories SET joke_count = joke_count - 1 WHERE id = %s",
+                       (category_id,))
+
+    return [name for _, name, _, _ in rows]
+
+
+def pick_in_category(cursor, name, attempts=3):
+    """Return a uniformly random (id, text) from the named category, or None."""
+    for _ in range(attempts):
+        cursor.execute("SELECT id, joke_count FROM categories WHERE name = %s", (name,))
+        row = cursor.fetchone()
+        if not row or not row[1]:
+            return None
+
+        category_id, joke_count = row
+        cursor.execute('''
+            SELECT j.id, j.text FROM joke_categories jc JOIN jokes j ON j.id = jc.joke_id
+            WHERE jc.category_id = %s AND jc.ordinal = %s
+        ''', (category_id, random.randint(1, joke_count)))
+        result = cursor.fetchone()
+        if result:
+            return result
+        # The category shrank between the two reads - count again
+    return None
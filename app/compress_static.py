@@ -0,0 +1,31 @@
+import gzip
+import os
+
+import brotli
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json')
+
+
+def compress_static(static_dir=STATIC_DIR):
+    """Write .gz and .br copies next to every text asset for nginx's *_static modules."""
+    for root, _, files in os.walk(static_dir):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+
+            print(f"✅ {os.path.relpath(path, static_dir)}: {len(data)} bytes → "
+                  f"{os.path.getsize(path + '.gz')} gzip, {os.path.getsize(path + '.br')} brotli")
+
+
+if __name__ == '__main__':
+    compress_static()
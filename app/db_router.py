@@ -0,0 +1,148 @@
+import threading
+import time
+
+import mysql.connector
+import mysql.connector.pooling
+
+
+def parse_endpoints(value, default_port=3306):
+    """Parse a "host[:port],host[:port]" string into (host, port) tuples."""
+    endpoints = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        endpoints.append((host, int(port) if port else default_port))
+    return endpoints
+
+
+class DBRouter:
+    """Sends writes to the primary and spreads reads over the replicas.
+
+    Replicas are picked round-robin. A replica that fails to connect within
+    ``connect_timeout`` seconds, errors on its lag check or lags more than
+    ``max_lag_seconds`` behind the primary is ejected for ``eject_seconds``
+    and then tried again; when no replica is usable, reads fall back to the
+    primary. The lag check (``SHOW REPLICA STATUS``) runs at most once every
+    ``check_seconds`` per replica.
+
+    Connections come from one ``MySQLConnectionPool`` of ``pool_size``
+    connections per endpoint, created (and filled) the first time the
+    endpoint is used or by warm_up(). When a pool is exhausted, a plain
+    connection is opened instead of waiting; ``pool_size=0`` turns pooling off.
+    """
+
+    def __init__(self, primary_config, replica_endpoints=(), eject_seconds=30,
+                 connect_timeout=3, max_lag_seconds=10, check_seconds=5, pool_size=5):
+        self.primary_config = dict(primary_config, connection_timeout=connect_timeout)
+        self.replica_configs = [
+            dict(self.primary_config, host=host, port=port)
+            for host, port in replica_endpoints
+        ]
+        self.eject_seconds = eject_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self._ejected_until = [0.0] * len(self.replica_configs)
+        self._checked_at = [0.0] * len(self.replica_configs)
+        self.pool_size = pool_size
+        self._pools = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+
+    def connect_primary(self, pooled=True):
+        return self._connect('primary', self.primary_config, pooled)
+
+    def connect_read(self, use_primary=False, pooled=True):
+        if use_primary or not self.replica_configs:
+            return self.connect_primary(pooled)
+
+        for index in self._replica_order():
+            try:
+                conn = self._connect(index, self.replica_configs[index], pooled)
+            except mysql.connector.Error:
+                self._eject(index)
+                continue
+
+            try:
+                if not self._lagging(index, conn):
+                    return conn
+            except mysql.connector.Error:
+                pass
+            conn.close()
+            self._eject(index)
+
+        # Every replica is down or ejected - the primary can still serve reads
+        return self.connect_primary(pooled)
+
+    def warm_up(self):
+        """Create and fill the pools of the primary and every reachable replica."""
+        self.connect_primary().close()
+        for index, config in enumerate(self.replica_configs):
+            try:
+                self._connect(index, config, True).close()
+            except mysql.connector.Error:
+                self._eject(index)
+
+    def replica_status(self):
+        now = time.monotonic()
+        return [
+            {
+                'host': config['host'],
+                'port': config['port'],
+                'status': 'ejected' if self._ejected_until[i] > now else 'ok'
+            }
+            for i, config in enumerate(self.replica_configs)
+        ]
+
+    def _connect(self, name, config, pooled):
+        if not pooled or not self.pool_size:
+            return mysql.connector.connect(**config)
+
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._pool_lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = mysql.connector.pooling.MySQLConnectionPool(pool_size=self.pool_size, **config)
+                    self._pools[name] = pool
+
+        try:
+            return pool.get_connection()
+        except mysql.connector.PoolError:
+            # Every pooled connection is checked out - don't make the request wait
+            return mysql.connector.connect(**config)
+
+    def _replica_order(self):
+        now = time.monotonic()
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.replica_configs)
+
+        count = len(self.replica_configs)
+        order = [(start + offset) % count for offset in range(count)]
+        return [i for i in order if self._ejected_until[i] <= now]
+
+    def _lagging(self, index, conn):
+        now = time.monotonic()
+        if now - self._checked_at[index] < self.check_seconds:
+            return False
+        self._checked_at[index] = now
+
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+
+        # No row or a NULL lag means replication is not running at all
+        lag = row.get('Seconds_Behind_Source') if row else None
+        return lag is None or lag > self.max_lag_seconds
+
+    def _eject(self, index):
+        with self._lock:
+            self._ejected_until[index] = time.monotonic() + self.eject_seconds
+            # Check the lag again as soon as it comes back
+            self._checked_at[index] = 0.0
@@ -0,0 +1,111 @@
+import argparse
+import csv
+import io
+import json
+import sys
+import zlib
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+CHUNK_SIZE = 500
+
+
+def iter_jokes(connect, after_id=0, chunk_size=CHUNK_SIZE):
+    """Yield (id, text) rows with id > after_id, in id order.
+
+    Uses an unbuffered cursor and fetches chunk_size rows at a time, so memory
+    stays flat no matter how many jokes there are. The connection is opened
+    with connect() on the first row asked for and always closed, even when
+    the consumer stops early.
+    """
+    conn = connect()
+    try:
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute("SELECT id, text FROM jokes WHERE id > %s ORDER BY id", (after_id,))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                # "Unread result found" when the client went away mid-export;
+                # closing the connection below drops the rest of the result
+                pass
+    finally:
+        conn.close()
+
+
+def iter_export(rows, export_format='ndjson', chunk_size=CHUNK_SIZE):
+    """Encode rows as NDJSON or CSV, yielding one text chunk per chunk_size rows."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {export_format}')
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == 'csv':
+        writer.writerow(['id', 'text'])
+
+    pending = 0
+    for joke_id, text in rows:
+        if export_format == 'csv':
+            writer.writerow([joke_id, text])
+        else:
+            buffer.write(json.dumps({'id': joke_id, 'text': text}) + '\n')
+        pending += 1
+
+        if pending >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def main():
+    from app import backends
+
+    parser = argparse.ArgumentParser(description='Export all jokes as NDJSON or CSV.')
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+    parser.add_argument('--after-id', type=int, default=0,
+                        help='Resume after this joke id (last id of a previous export)')
+    parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+    parser.add_argument('--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+
+    chunks = iter_export(iter_jokes(lambda: backends.db_router.connect_read(pooled=False), args.after_id), args.format)
+
+    if args.gzip:
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        chunks = gzip_chunks(chunks)
+    else:
+        out = open(args.output, 'w', newline='') if args.output else sys.stdout
+
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+import os
+
+bind = '0.0.0.0:5000'
+workers = 2
+
+# Import the app once in the master and fork the workers from it. Backend
+# clients are only created inside each worker (see backends.py), so nothing
+# opened before the fork is shared between processes.
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Runs in the new worker before it accepts connections
+    if os.environ.get('WARM_UP', '1') == '1':
+        from app import warm_up
+        warm_up()
@@ -1,5 +1,7 @@
 import mysql.connector
 
+from categories import tag_joke
+
 db_config = {
     'host': 'localhost',
     'user': 'joke_user',
@@ -8,56 +10,56 @@ db_config = {
 }
 
 jokes = [
-    "Why don't scientists trust atoms? Because they make up everything!",
-    "I told my wife she was drawing her eyebrows too high. She looked surprised.",
-    "What do you call a fake noodle? An impasta!",
-    "Why did the scarecrow win an award? He was outstanding in his field!",
-    "I'm reading a book about anti-gravity. It's impossible to put down!",
-    "Did you hear about the restaurant on the moon? Great food, no atmosphere.",
-    "Why don't eggs tell jokes? They'd crack each other up!",
-    "I used to hate facial hair, but then it grew on me.",
-    "What do you call a bear with no teeth? A gummy bear!",
-    "Why did the bicycle fall over? Because it was two tired!",
-    "What do you call cheese that isn't yours? Nacho cheese!",
-    "I'm afraid for the calendar. Its days are numbered.",
-    "What's the best time to go to the dentist? Tooth hurty!",
-    "How do you organize a space party? You planet!",
-    "Why can't you hear a pterodactyl go to the bathroom? Because the P is silent!",
-    "What did the ocean say to the beach? Nothing, it just waved.",
-    "Why do chicken coops only have two doors? Because if they had four, they'd be chicken sedans!",
-    "What's orange and sounds like a parrot? A carrot!",
-    "How does a penguin build its house? Igloos it together!",
-    "Why did the math book look so sad? Because it had too many problems.",
-    "What do you call a dog magician? A labracadabrador!",
-    "Why don't skeletons fight each other? They don't have the guts.",
-    "What did the left eye say to the right eye? Between you and me, something smells.",
-    "Why did the coffee file a police report? It got mugged!",
-    "What do you call a pile of cats? A meowtain!",
-    "How do you make a tissue dance? You put a little boogie in it!",
-    "Why did the golfer bring two pairs of pants? In case he got a hole in one!",
-    "What's brown and sticky? A stick!",
-    "Why don't oysters donate to charity? Because they're shellfish!",
-    "What do you call a sleeping bull? A bulldozer!",
-    "Why did the tomato turn red? Because it saw the salad dressing!",
-    "What do you call a fish wearing a crown? A king fish!",
-    "Why did the cookie go to the doctor? Because it felt crumbly!",
-    "What do you call a cow with no legs? Ground beef!",
-    "Why did the picture go to jail? Because it was framed!",
-    "What did one wall say to the other wall? I'll meet you at the corner!",
-    "Why don't scientists trust stairs? Because they're always up to something!",
-    "What do you call a belt made of watches? A waist of time!",
-    "Why did the stadium get hot after the game? All the fans left!",
-    "What do you call a snowman in July? A puddle!",
-    "Why did the computer go to the doctor? Because it had a virus!",
-    "What do you call a lazy kangaroo? A pouch potato!",
-    "Why did the banana go to the doctor? Because it wasn't peeling well!",
-    "What do you call a group of unorganized cats? A cat-astrophe!",
-    "Why did the mushroom go to the party? Because he was a fungi!",
-    "What do you call a deer with no eyes? No eye deer!",
-    "Why did the skeleton go to the party alone? He had no body to go with him!",
-    "What do you call a factory that makes okay products? A satisfactory!",
-    "Why did the invisible man turn down the job offer? He couldn't see himself doing it!",
-    "What do you call a sleeping dinosaur? A dino-snore!"
+    ("Why don't scientists trust atoms? Because they make up everything!", ['science']),
+    ("I told my wife she was drawing her eyebrows too high. She looked surprised.", ['everyday']),
+    ("What do you call a fake noodle? An impasta!", ['food']),
+    ("Why did the scarecrow win an award? He was outstanding in his field!", ['everyday']),
+    ("I'm reading a book about anti-gravity. It's impossible to put down!", ['science']),
+    ("Did you hear about the restaurant on the moon? Great food, no atmosphere.", ['science', 'food']),
+    ("Why don't eggs tell jokes? They'd crack each other up!", ['food']),
+    ("I used to hate facial hair, but then it grew on me.", ['everyday']),
+    ("What do you call a bear with no teeth? A gummy bear!", ['animals']),
+    ("Why did the bicycle fall over? Because it was two tired!", ['everyday']),
+    ("What do you call cheese that isn't yours? Nacho cheese!", ['food']),
+    ("I'm afraid for the calendar. Its days are numbered.", ['everyday']),
+    ("What's the best time to go to the dentist? Tooth hurty!", ['everyday']),
+    ("How do you organize a space party? You planet!", ['science']),
+    ("Why can't you hear a pterodactyl go to the bathroom? Because the P is silent!", ['animals']),
+    ("What did the ocean say to the beach? Nothing, it just waved.", ['everyday']),
+    ("Why do chicken coops only have two doors? Because if they had four, they'd be chicken sedans!", ['animals']),
+    ("What's orange and sounds like a parrot? A carrot!", ['food']),
+    ("How does a penguin build its house? Igloos it together!", ['animals']),
+    ("Why did the math book look so sad? Because it had too many problems.", ['science']),
+    ("What do you call a dog magician? A labracadabrador!", ['animals']),
+    ("Why don't skeletons fight each other? They don't have the guts.", ['spooky']),
+    ("What did the left eye say to the right eye? Between you and me, something smells.", ['everyday']),
+    ("Why did the coffee file a police report? It got mugged!", ['food']),
+    ("What do you call a pile of cats? A meowtain!", ['animals']),
+    ("How do you make a tissue dance? You put a little boogie in it!", ['everyday']),
+    ("Why did the golfer bring two pairs of pants? In case he got a hole in one!", ['everyday']),
+    ("What's brown and sticky? A stick!", ['everyday']),
+    ("Why don't oysters donate to charity? Because they're shellfish!", ['animals', 'food']),
+    ("What do you call a sleeping bull? A bulldozer!", ['animals']),
+    ("Why did the tomato turn red? Because it saw the salad dressing!", ['food']),
+    ("What do you call a fish wearing a crown? A king fish!", ['animals']),
+    ("Why did the cookie go to the doctor? Because it felt crumbly!", ['food']),
+    ("What do you call a cow with no legs? Ground beef!", ['animals', 'food']),
+    ("Why did the picture go to jail? Because it was framed!", ['everyday']),
+    ("What did one wall say to the other wall? I'll meet you at the corner!", ['everyday']),
+    ("Why don't scientists trust stairs? Because they're always up to something!", ['science']),
+    ("What do you call a belt made of watches? A waist of time!", ['everyday']),
+    ("Why did the stadium get hot after the game? All the fans left!", ['everyday']),
+    ("What do you call a snowman in July? A puddle!", ['everyday']),
+    ("Why did the computer go to the doctor? Because it had a virus!", ['science']),
+    ("What do you call a lazy kangaroo? A pouch potato!", ['animals']),
+    ("Why did the banana go to the doctor? Because it wasn't peeling well!", ['food']),
+    ("What do you call a group of unorganized cats? A cat-astrophe!", ['animals']),
+    ("Why did the mushroom go to the party? Because he was a fungi!", ['food']),
+    ("What do you call a deer with no eyes? No eye deer!", ['animals']),
+    ("Why did the skeleton go to the party alone? He had no body to go with him!", ['spooky']),
+    ("What do you call a factory that makes okay products? A satisfactory!", ['everyday']),
+    ("Why did the invisible man turn down the job offer? He couldn't see himself doing it!", ['spooky']),
+    ("What do you call a sleeping dinosaur? A dino-snore!", ['animals', 'science'])
 ]
 
 EXPECTED_JOKE_COUNT = 50
@@ -79,6 +81,8 @@ try:
         if count != EXPECTED_JOKE_COUNT:
             print(f"⚠️  Found {count} jokes, but expected {EXPECTED_JOKE_COUNT}.")
             print("🗑️  Dropping table and reinitializing...")
+            cursor.execute("DROP TABLE IF EXISTS joke_categories")
+            cursor.execute("DROP TABLE IF EXISTS joke_stats")
             cursor.execute("DROP TABLE jokes")
             should_initialize = True
         else:
@@ -92,17 +96,101 @@ try:
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS jokes (
                 id INT AUTO_INCREMENT PRIMARY KEY,
-                text TEXT NOT NULL
+                text TEXT NOT NULL,
+                weight DOUBLE NULL
             )
         ''')
 
         # Insert jokes
-        for joke in jokes:
+        for joke, _ in jokes:
             cursor.execute("INSERT INTO jokes (text) VALUES (%s)", (joke,))
 
         conn.commit()
         print(f"✅ Successfully inserted {len(jokes)} jokes into the database!")
 
+    # Weight for weighted selection (NULL = derive from votes), added to
+    # tables created before the column existed
+    cursor.execute("SHOW COLUMNS FROM jokes LIKE 'weight'")
+    if cursor.fetchone() is None:
+        print("⚖️  Adding weight column to jokes...")
+        cursor.execute("ALTER TABLE jokes ADD COLUMN weight DOUBLE NULL")
+
+    # Categories: jokes are numbered 1..joke_count within each category
+    # (see categories.py), and the unique (category_id, ordinal) key turns a
+    # random-by-category pick into one index lookup. The secondary key serves
+    # lookups and cascading deletes by joke
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(50) NOT NULL UNIQUE,
+            joke_count INT NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS joke_categories (
+            category_id INT NOT NULL,
+            joke_id INT NOT NULL,
+            ordinal INT NOT NULL,
+            PRIMARY KEY (category_id, joke_id),
+            UNIQUE KEY uniq_joke_categories_ordinal (category_id, ordinal),
+            KEY idx_joke_categories_joke (joke_id),
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE,
+            FOREIGN KEY (joke_id) REFERENCES jokes (id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Number the jokes of tables created before the ordinals existed
+    cursor.execute("SHOW COLUMNS FROM joke_categories LIKE 'ordinal'")
+    if cursor.fetchone() is None:
+        print("🔢 Numbering jokes within their categories...")
+        cursor.execute("ALTER TABLE categories ADD COLUMN joke_count INT NOT NULL DEFAULT 0")
+        cursor.execute("ALTER TABLE joke_categories ADD COLUMN ordinal INT NOT NULL DEFAULT 0")
+        cursor.execute('''
+            UPDATE joke_categories jc JOIN (
+                SELECT category_id, joke_id,
+                    ROW_NUMBER() OVER (PARTITION BY category_id ORDER BY joke_id) AS ordinal
+                FROM joke_categories
+            ) numbered USING (category_id, joke_id)
+            SET jc.ordinal = numbered.ordinal
+        ''')
+        cursor.execute("ALTER TABLE joke_categories ALTER COLUMN ordinal DROP DEFAULT, "
+                       "ADD UNIQUE KEY uniq_joke_categories_ordinal (category_id, ordinal)")
+        cursor.execute('''
+            UPDATE categories c SET joke_count =
+                (SELECT COUNT(*) FROM joke_categories jc WHERE jc.category_id = c.id)
+        ''')
+        conn.commit()
+
+    # View and vote counters, filled by the write-behind flusher in stats.py.
+    # joke_stats_flushes remembers applied batches so none is counted twice.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS joke_stats (
+            joke_id INT PRIMARY KEY,
+            views BIGINT NOT NULL DEFAULT 0,
+            upvotes BIGINT NOT NULL DEFAULT 0,
+            downvotes BIGINT NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS joke_stats_flushes (
+            batch_id CHAR(32) PRIMARY KEY,
+            flushed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute("SELECT COUNT(*) FROM joke_categories")
+    if cursor.fetchone()[0] == 0:
+        print("🏷️  Tagging built-in jokes with categories...")
+        # Counts left over from a dropped joke_categories table
+        cursor.execute("UPDATE categories SET joke_count = 0")
+        for joke, categories in jokes:
+            cursor.execute("SELECT id FROM jokes WHERE text = %s", (joke,))
+            for (joke_id,) in cursor.fetchall():
+                tag_joke(cursor, joke_id, sorted(categories))
+
+        conn.commit()
+        print("✅ Categories seeded!")
+
     cursor.close()
     conn.close()
 
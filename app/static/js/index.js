@@ -0,0 +1,75 @@
+let currentJokeId = null;
+
+function setVotingEnabled(enabled) {
+    document.querySelectorAll('.vote-btn').forEach(btn => btn.disabled = !enabled);
+}
+
+async function vote(direction) {
+    if (currentJokeId === null) {
+        return;
+    }
+    setVotingEnabled(false);
+
+    const body = new URLSearchParams({vote: direction});
+    try {
+        await fetch('/vote/' + currentJokeId, {method: 'POST', body: body});
+    } catch (error) {
+        // Votes are best effort
+    }
+}
+
+async function getJoke() {
+    const jokeEl = document.getElementById('joke');
+    const sourceEl = document.getElementById('source');
+    const timeEl = document.getElementById('responseTime');
+
+    jokeEl.className = 'joke-text loading';
+    jokeEl.textContent = 'Loading joke...';
+
+    const startTime = performance.now();
+
+    try {
+        const category = document.getElementById('category').value;
+        const response = await fetch(category ? '/joke?category=' + encodeURIComponent(category) : '/joke');
+        const data = await response.json();
+        const endTime = performance.now();
+        const responseTime = Math.round(endTime - startTime);
+
+        jokeEl.className = 'joke-text fade-in';
+        jokeEl.textContent = data.joke;
+        currentJokeId = data.id === undefined ? null : data.id;
+        // Voting is off without the Redis cache backend
+        setVotingEnabled(currentJokeId !== null && data.votable === true);
+
+        sourceEl.innerHTML = data.source === 'cache' 
+            ? 'Redis <span class="cache-indicator cached"></span>' 
+            : 'MySQL <span class="cache-indicator fresh"></span>';
+        timeEl.textContent = responseTime + 'ms';
+    } catch (error) {
+        jokeEl.className = 'joke-text';
+        jokeEl.textContent = 'Oops! Failed to fetch a joke. Try again!';
+    }
+}
+
+async function loadCategories() {
+    try {
+        const response = await fetch('/categories');
+        const data = await response.json();
+        const selectEl = document.getElementById('category');
+
+        data.categories.forEach(category => {
+            const option = document.createElement('option');
+            option.value = category.name;
+            option.textContent = category.name + ' (' + category.jokes + ')';
+            selectEl.appendChild(option);
+        });
+    } catch (error) {
+        // Category filter is optional - random jokes still work
+    }
+}
+
+// Load a joke on page load
+window.onload = () => {
+    loadCategories();
+    getJoke();
+};
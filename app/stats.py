@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+
+import mysql.connector
+import redis
+
+STATS_KEY = 'joke:stats'
+BATCH_PREFIX = 'joke:stats:batch:'
+COUNTERS = ('views', 'upvotes', 'downvotes')
+
+
+class JokeStats:
+    """Write-behind view and vote counters.
+
+    Requests only bump fields of the ``joke:stats`` Redis hash. A background
+    thread periodically renames the hash to a uniquely named batch key (so new
+    increments start a fresh hash), folds the batch into MySQL with one
+    batched upsert and deletes it. The batch id is recorded in
+    ``joke_stats_flushes`` in the same transaction, so a batch left behind by
+    a worker that died mid-flush is picked up again but never applied twice.
+    """
+
+    key = STATS_KEY
+
+    def __init__(self, redis_client, connect, flush_seconds=10):
+        self.redis = redis_client
+        self.connect = connect
+        self.flush_seconds = flush_seconds
+        self._thread = None
+
+    def record_vote(self, joke_id, upvote):
+        self._incr(joke_id, 'upvotes' if upvote else 'downvotes')
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='joke-stats-flusher', daemon=True)
+            self._thread.start()
+
+    def flush(self):
+        # Leftovers from a flusher that died first, then the live hash
+        for batch_key in self.redis.scan_iter(match=BATCH_PREFIX + '*'):
+            self._flush_batch(batch_key)
+
+        batch_key = BATCH_PREFIX + uuid.uuid4().hex
+        try:
+            self.redis.rename(STATS_KEY, batch_key)
+        except redis.ResponseError:
+            # Nothing counted since the last flush
+            return
+        self._flush_batch(batch_key)
+
+    def _incr(self, joke_id, counter):
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hincrby(STATS_KEY, f'{joke_id}:{counter}', 1)
+            pipe.execute()
+        except redis.RedisError:
+            # Counters are best effort - never fail the request over them
+            pass
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except (redis.RedisError, mysql.connector.Error) as e:
+                print(f"⚠️  Stats flush failed, retrying in {self.flush_seconds}s: {e}")
+
+    def _flush_batch(self, batch_key):
+        totals = {}
+        for field, value in self.redis.hgetall(batch_key).items():
+            joke_id, _, counter = field.partition(':')
+            if counter in COUNTERS:
+                totals.setdefault(int(joke_id), dict.fromkeys(COUNTERS, 0))[counter] += int(value)
+
+        if totals:
+            self._apply(batch_key[len(BATCH_PREFIX):], totals)
+        self.redis.delete(batch_key)
+
+    def _apply(self, batch_id, totals):
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            try:
+                cursor.execute("INSERT INTO joke_stats_flushes (batch_id) VALUES (%s)", (batch_id,))
+            except mysql.connector.IntegrityError:
+                # Already applied by an earlier flush that died before cleaning up
+                conn.rollback()
+                return
+
+            # Skip counters for jokes deleted in the meantime
+            placeholders = ', '.join(['%s'] * len(totals))
+            cursor.execute(f"SELECT id FROM jokes WHERE id IN ({placeholders})", tuple(totals))
+            existing = {row[0] for row in cursor.fetchall()}
+
+            rows = [
+                (joke_id, counts['views'], counts['upvotes'], counts['downvotes'])
+                for joke_id, counts in totals.items() if joke_id in existing
+            ]
+            if rows:
+                cursor.executemany('''
+                    INSERT INTO joke_stats (joke_id, views, upvotes, downvotes)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        views = views + VALUES(views),
+                        upvotes = upvotes + VALUES(upvotes),
+                        downvotes = downvotes + VALUES(downvotes)
+                ''', rows)
+
+            # A batch can only be retried within seconds, a day of history is plenty
+            cursor.execute("DELETE FROM joke_stats_flushes WHERE flushed_at < NOW() - INTERVAL 1 DAY")
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
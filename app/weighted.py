@@ -0,0 +1,235 @@
+import json
+import random
+import threading
+import time
+import uuid
+from array import array
+
+# The latest weight change as JSON: its version, the version it follows, the
+# joke id and the new weight (null for a deleted joke)
+WEIGHTS_CHANGE_KEY = 'joke:weights:change'
+
+# Effective weight: the admin-set weight, or else one derived from votes
+# (Laplace-smoothed upvote share, scaled so an unrated joke weighs 1)
+WEIGHTS_QUERY = '''
+    SELECT j.id, COALESCE(
+        j.weight,
+        2 * (COALESCE(s.upvotes, 0) + 1) / (COALESCE(s.upvotes, 0) + COALESCE(s.downvotes, 0) + 2)
+    )
+    FROM jokes j LEFT JOIN joke_stats s ON s.joke_id = j.id
+'''
+
+
+class AliasTable:
+    """Walker/Vose alias table over parallel id/weight arrays.
+
+    Building is O(n); sample() is O(1) and uses a single random draw: the
+    integer part picks a column, the fraction decides between the column's
+    own id and its alias.
+    """
+
+    def __init__(self, ids, weights):
+        n = len(ids)
+        self.ids = array('q', ids)
+        self.prob = array('d', [1.0]) * n
+        self.alias = array('q', range(n))
+
+        total = sum(weights)
+        if total <= 0:
+            self.ids = array('q')
+            return
+
+        scaled = array('d', (w * n / total for w in weights))
+        small = array('q', (i for i in range(n) if scaled[i] < 1.0))
+        large = array('q', (i for i in range(n) if scaled[i] >= 1.0))
+
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left is 1.0 up to rounding and keeps prob 1.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def sample(self, rand=random.random):
+        n = len(self.ids)
+        if not n:
+            return None
+        u = rand() * n
+        column = int(u)
+        if u - column < self.prob[column]:
+            return self.ids[column]
+        return self.ids[self.alias[column]]
+
+
+class WeightedSelector:
+    """Per-worker popularity-weighted picker backed by an AliasTable.
+
+    pick() only samples the current table. Everything that costs O(n) -
+    loading weights, applying changes, building tables - happens on a
+    background thread, which swaps each new table in with one assignment.
+
+    Weight changes made through this worker are applied to the arrays right
+    away (under a lock, so concurrent requests cannot corrupt them), published
+    to the cache as a delta and wake the thread to rebuild the table. The
+    thread also looks at the cache every poll_seconds and applies another
+    worker's delta when it follows the version it has; if it missed one, it
+    reloads everything. Two changes published at the same instant can hide
+    one another, and vote-derived weights drift, so it also reloads every
+    refresh_seconds. Reloads read the primary, so a lagging replica cannot
+    pin stale weights.
+    """
+
+    def __init__(self, cache, connect, refresh_seconds=60, poll_seconds=1):
+        self.cache = cache
+        self.connect = connect
+        self.refresh_seconds = refresh_seconds
+        self.poll_seconds = poll_seconds
+        self._ids = array('q')
+        self._weights = array('d')
+        self._positions = {}
+        self._table = AliasTable(self._ids, self._weights)
+        self._version = None
+        self._loaded_at = None
+        self._changed = False
+        # Guards the arrays, positions, version and _changed
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='joke-weights-builder', daemon=True)
+            self._thread.start()
+
+    def pick(self):
+        return self._table.sample()
+
+    def reload(self):
+        # Version first: a change published during the query is applied again
+        # on the next poll, which is harmless as deltas carry absolute weights
+        change = self._latest_change()
+        ids = array('q')
+        weights = array('d')
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(WEIGHTS_QUERY)
+            for joke_id, weight in cursor:
+                ids.append(joke_id)
+                weights.append(float(weight))
+        finally:
+            cursor.close()
+            conn.close()
+
+        positions = {joke_id: i for i, joke_id in enumerate(ids)}
+        table = AliasTable(ids, weights)
+        with self._lock:
+            self._ids, self._weights, self._positions = ids, weights, positions
+            self._version = change['version'] if change else None
+            self._loaded_at = time.monotonic()
+            self._changed = False
+        self._table = table
+
+    def set_weight(self, joke_id, weight):
+        """Apply and publish an added/reweighted joke (weight) or a removed one (None)."""
+        with self._lock:
+            self._apply(joke_id, weight)
+        self._publish(joke_id, weight)
+        self._wake.set()
+
+    def refresh_weight(self, joke_id):
+        """Re-read one joke's effective weight from MySQL, e.g. after a reset to auto."""
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(WEIGHTS_QUERY + ' WHERE j.id = %s', (joke_id,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        self.set_weight(joke_id, float(row[1]) if row else None)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            try:
+                self._sync()
+            except Exception as e:
+                # Keep picking from the last table and try again next poll
+                print(f"⚠️  Weight refresh failed, retrying in {self.poll_seconds}s: {e}")
+
+    def _sync(self):
+        change = self._latest_change()
+        version = change['version'] if change else None
+
+        with self._lock:
+            full_reload = self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+            if not full_reload and version != self._version:
+                if change and change['prev'] == self._version:
+                    self._apply(change['id'], change['weight'])
+                    self._version = version
+                else:
+                    # Missed a change (or the cache was flushed)
+                    full_reload = True
+
+        if full_reload:
+            self.reload()
+            return
+
+        with self._lock:
+            if not self._changed:
+                return
+            # Build from a snapshot so requests can keep changing the arrays
+            ids, weights = array('q', self._ids), array('d', self._weights)
+            self._changed = False
+        self._table = AliasTable(ids, weights)
+
+    def _latest_change(self):
+        value = self.cache.get(WEIGHTS_CHANGE_KEY)
+        return json.loads(value) if value else None
+
+    def _apply(self, joke_id, weight):
+        # Caller holds self._lock
+        position = self._positions.get(joke_id)
+
+        if weight is None:
+            if position is None:
+                return
+            # Swap-remove keeps the arrays dense without shifting them
+            last = len(self._ids) - 1
+            last_id = self._ids[last]
+            self._ids[position] = last_id
+            self._weights[position] = self._weights[last]
+            self._positions[last_id] = position
+            del self._ids[last], self._weights[last], self._positions[joke_id]
+        elif position is None:
+            self._positions[joke_id] = len(self._ids)
+            self._ids.append(joke_id)
+            self._weights.append(weight)
+        else:
+            self._weights[position] = weight
+
+        self._changed = True
+
+    def _publish(self, joke_id, weight):
+        change = self._latest_change()
+        prev = change['version'] if change else None
+        version = uuid.uuid4().hex
+        self.cache.setex(WEIGHTS_CHANGE_KEY, 86400, json.dumps(
+            {'version': version, 'prev': prev, 'id': joke_id, 'weight': weight}))
+
+        with self._lock:
+            if prev == self._version:
+                self._version = version
+            else:
+                # This worker has not seen the previous change yet
+                self._loaded_at = None